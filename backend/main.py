@@ -1,14 +1,18 @@
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Iterable, Iterator, BinaryIO
+from concurrent.futures import ThreadPoolExecutor
 import uuid
 import os
-import io
-import pandas as pd
-from scanner import Scanner
+import time
+import threading
+import tempfile
+import xlsxwriter
+from scanner import Scanner, is_valid_domain
 
 app = FastAPI()
 
@@ -22,6 +26,17 @@ app.add_middleware(
 
 # In-memory storage for scan results
 SCAN_RESULTS: Dict[str, Dict[str, Any]] = {}
+SCAN_RESULTS_LOCK = threading.Lock()
+# Finished scans are dropped after this long so the store does not grow forever
+SCAN_TTL_SECONDS = int(os.getenv("SCAN_TTL_SECONDS", "86400"))
+FINISHED_STATUSES = ("discovery_completed", "scan_completed", "failed")
+
+# Scan jobs run on their own pool instead of BackgroundTasks, which shares the
+# threadpool that serves sync endpoints. A long subfinder/nuclei chain then
+# never holds a thread that /scan/{scan_id} polls need.
+# The pool size caps how many scans run at once; further jobs wait in FIFO order.
+MAX_PARALLEL_SCANS = max(1, int(os.getenv("MAX_PARALLEL_SCANS", "5")))
+SCAN_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_PARALLEL_SCANS, thread_name_prefix="scan")
 
 class DiscoveryRequest(BaseModel):
     domain: str
@@ -30,9 +45,36 @@ class NucleiScanRequest(BaseModel):
     scan_id: str
     targets: List[str]
 
+def _valid_uuid(value: str) -> bool:
+    # Scan IDs are uuid4 strings; reject anything else before touching the store
+    try:
+        uuid.UUID(value)
+        return True
+    except ValueError:
+        return False
+
+def set_scan_status(scan_id: str, status: str):
+    # The TTL counts from when a scan finished, so a long discovery or a late
+    # nuclei run is not evicted the moment it completes
+    with SCAN_RESULTS_LOCK:
+        scan = SCAN_RESULTS[scan_id]
+        scan["status"] = status
+        if status in FINISHED_STATUSES:
+            scan["finished_at"] = time.time()
+
+def prune_expired_scans():
+    cutoff = time.time() - SCAN_TTL_SECONDS
+    with SCAN_RESULTS_LOCK:
+        expired = [
+            scan_id for scan_id, scan in SCAN_RESULTS.items()
+            if scan["status"] in FINISHED_STATUSES and scan["finished_at"] < cutoff
+        ]
+        for scan_id in expired:
+            del SCAN_RESULTS[scan_id]
+
 def run_discovery_task(scan_id: str, domain: str):
     scanner = Scanner()
-    SCAN_RESULTS[scan_id]["status"] = "running_discovery"
+    set_scan_status(scan_id, "running_discovery")
     
     def update_status(message: str):
         SCAN_RESULTS[scan_id]["status_message"] = message
@@ -40,14 +82,14 @@ def run_discovery_task(scan_id: str, domain: str):
     try:
         results = scanner.run_discovery(domain, status_callback=update_status)
         SCAN_RESULTS[scan_id]["data"] = results
-        SCAN_RESULTS[scan_id]["status"] = "discovery_completed"
+        set_scan_status(scan_id, "discovery_completed")
     except Exception as e:
-        SCAN_RESULTS[scan_id]["status"] = "failed"
+        set_scan_status(scan_id, "failed")
         SCAN_RESULTS[scan_id]["error"] = str(e)
 
 def run_nuclei_task(scan_id: str, targets: List[str]):
     scanner = Scanner()
-    SCAN_RESULTS[scan_id]["status"] = "running_nuclei"
+    set_scan_status(scan_id, "running_nuclei")
     def update_status(message: str):
         SCAN_RESULTS[scan_id]["status_message"] = message
 
@@ -59,133 +101,190 @@ def run_nuclei_task(scan_id: str, targets: List[str]):
              SCAN_RESULTS[scan_id]["data"] = {}
         
         SCAN_RESULTS[scan_id]["data"]["vulnerabilities"] = results
-        SCAN_RESULTS[scan_id]["status"] = "scan_completed"
+        set_scan_status(scan_id, "scan_completed")
     except Exception as e:
-        SCAN_RESULTS[scan_id]["status"] = "failed"
+        set_scan_status(scan_id, "failed")
         SCAN_RESULTS[scan_id]["error"] = str(e)
 
 @app.post("/scan/discovery")
-def start_discovery(request: DiscoveryRequest, background_tasks: BackgroundTasks):
+def start_discovery(request: DiscoveryRequest):
+    # Pasted domains often carry surrounding whitespace; anything else malformed is rejected
+    domain = request.domain.strip()
+    if not is_valid_domain(domain):
+        raise HTTPException(status_code=400, detail="Invalid domain")
+    prune_expired_scans()
     scan_id = str(uuid.uuid4())
-    SCAN_RESULTS[scan_id] = {
-        "status": "pending",
-        "domain": request.domain,
-        "data": None,
-        "type": "discovery", # Track scan type
-        "status_message": "Initializing..."
-    }
-    background_tasks.add_task(run_discovery_task, scan_id, request.domain)
+    with SCAN_RESULTS_LOCK:
+        SCAN_RESULTS[scan_id] = {
+            "status": "pending",
+            "domain": domain,
+            "data": None,
+            "type": "discovery", # Track scan type
+            "status_message": "Initializing...",
+            "created_at": time.time()
+        }
+    SCAN_EXECUTOR.submit(run_discovery_task, scan_id, domain)
     return {"scan_id": scan_id}
 
 @app.post("/scan/nuclei")
-def start_nuclei_scan(request: NucleiScanRequest, background_tasks: BackgroundTasks):
+def start_nuclei_scan(request: NucleiScanRequest):
     scan_id = request.scan_id
-    if scan_id not in SCAN_RESULTS:
-        raise HTTPException(status_code=404, detail="Scan ID not found")
-    
-    # Verify discovery is done
-    if SCAN_RESULTS[scan_id]["status"] != "discovery_completed":
-         raise HTTPException(status_code=400, detail="Discovery must be completed before running Nuclei")
+    if not _valid_uuid(scan_id):
+        raise HTTPException(status_code=400, detail="Invalid scan ID")
+    # Checked and claimed under the lock, so a concurrent prune cannot remove the
+    # scan in between and a second request cannot start nuclei twice
+    with SCAN_RESULTS_LOCK:
+        scan = SCAN_RESULTS.get(scan_id)
+        if scan is None:
+            raise HTTPException(status_code=404, detail="Scan ID not found")
+        
+        # Verify discovery is done
+        if scan["status"] != "discovery_completed":
+             raise HTTPException(status_code=400, detail="Discovery must be completed before running Nuclei")
 
-    SCAN_RESULTS[scan_id]["status"] = "pending_nuclei"
-    background_tasks.add_task(run_nuclei_task, scan_id, request.targets)
+        scan["status"] = "pending_nuclei"
+    SCAN_EXECUTOR.submit(run_nuclei_task, scan_id, request.targets)
     return {"message": "Nuclei scan started", "scan_id": scan_id}
 
 @app.get("/scan/{scan_id}")
 def get_scan_result(scan_id: str):
-    if scan_id not in SCAN_RESULTS:
+    if not _valid_uuid(scan_id):
+        raise HTTPException(status_code=400, detail="Invalid scan ID")
+    # A single lookup: a concurrent prune may drop the entry at any point
+    scan = SCAN_RESULTS.get(scan_id)
+    if scan is None:
         raise HTTPException(status_code=404, detail="Scan not found")
-    return SCAN_RESULTS[scan_id]
+    return scan
 
-@app.get("/export/{scan_id}")
-def export_scan_result(scan_id: str):
-    if scan_id not in SCAN_RESULTS:
-        raise HTTPException(status_code=404, detail="Scan not found")
-    
-    scan_data = SCAN_RESULTS[scan_id]
-    if scan_data["status"] not in ["discovery_completed", "scan_completed"] or not scan_data["data"]:
-         raise HTTPException(status_code=400, detail="Scan not completed yet")
+# Export schema: header tuples and the row builders that fill them, in the same column order
+HTTPX_EXPORT_HEADERS = ("URL", "Status Code", "Title", "Webserver", "Tech", "Host", "IP", "Port")
+NUCLEI_EXPORT_HEADERS = (
+    "Name", "Severity", "Matched At", "Host", "Type", "Matcher Name",
+    "Extracted Results", "CVE ID", "CVSS Score", "Description"
+)
+# Bytes per read when streaming the finished workbook
+EXPORT_CHUNK_SIZE = 1 << 16
+
+def _write_as_text(worksheet, row: int, col: int, value: Any, cell_format=None):
+    # xlsxwriter only writes scalars; render lists/dicts (e.g. cve_id) as text
+    return worksheet.write_string(row, col, str(value), cell_format)
+
+def _write_sheet(workbook: xlsxwriter.Workbook, name: str, headers: Iterable[str], rows: Iterable[tuple]):
+    worksheet = workbook.add_worksheet(name)
+    # Non-scalar cells are rare, so they are converted by type dispatch inside
+    # xlsxwriter instead of checking every cell of every row here.
+    worksheet.add_write_handler(list, _write_as_text)
+    worksheet.add_write_handler(dict, _write_as_text)
+    worksheet.write_row(0, 0, headers)
+    for row_idx, row in enumerate(rows, 1):
+        worksheet.write_row(row_idx, 0, row)
+
+def _httpx_row(host: Dict[str, Any]) -> tuple:
+    get = host.get
+    tech = get("tech")
+    return (
+        get("url"),
+        get("status_code"),
+        get("title"),
+        get("webserver"),
+        ", ".join(tech) if tech else "",
+        get("host"),
+        get("ip"),
+        get("port")
+    )
+
+def _nuclei_row(vuln: Dict[str, Any]) -> tuple:
+    get = vuln.get
+    info = get("info", {})
+    classification = info.get("classification", {})
+    matchers = get("matchers")
+    extracted = get("extracted_results_list") or get("extracted_results")
+    return (
+        info.get("name", get("template_id")),
+        info.get("severity"),
+        get("matched_at"),
+        get("host"),
+        get("type"),
+        ", ".join(matchers) if matchers else get("matcher_name"),
+        ", ".join(extracted) if isinstance(extracted, list) else extracted,
+        classification.get("cve_id"),
+        classification.get("cvss_score"),
+        info.get("description")
+    )
+
+def _build_xlsx(data: Dict[str, Any], domain: str) -> BinaryIO:
+    """Writes the export workbook to a temp file and returns it opened for reading."""
+    # Create Excel file on disk so large exports are not held in RAM. The path is
+    # unlinked as soon as it is reopened, so the space is freed when the handle is
+    # closed however the response ends (error, Range rejection, client disconnect).
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp:
+        export_path = tmp.name
+    # constant_memory flushes each row as soon as the next one is started, so every
+    # sheet below is written strictly top-to-bottom, once, without styling.
+    workbook = xlsxwriter.Workbook(export_path, {'constant_memory': True, 'strings_to_urls': False})
     
-    data = scan_data["data"]
+    try:
+        # 1. Summary Data
+        _write_sheet(workbook, 'Summary', ["Metric", "Value"], [
+            ("Domain", domain),
+            ("Subdomains Found", len(data.get("subdomains", []))),
+            ("Live Hosts", len(data.get("live_hosts", []))),
+            ("Emails Found", len(data.get("emails", []))),
+            ("Vulnerabilities Found", len(data.get("vulnerabilities", [])))
+        ])
     
-    # 1. Summary Data
-    summary_data = {
-        "Metric": ["Domain", "Subdomains Found", "Live Hosts", "Emails Found", "Vulnerabilities Found"],
-        "Value": [
-            scan_data["domain"],
-            len(data.get("subdomains", [])),
-            len(data.get("live_hosts", [])),
-            len(data.get("emails", [])),
-            len(data.get("vulnerabilities", []))
-        ]
-    }
-    df_summary = pd.DataFrame(summary_data)
+        # 2. Subdomains Data
+        _write_sheet(workbook, 'subfinder + amass', ["Subdomain"], ((s,) for s in data.get("subdomains", [])))
     
-    # 2. Subdomains Data
-    df_subdomains = pd.DataFrame(data.get("subdomains", []), columns=["Subdomain"])
+        # 2.5 MX Records
+        mx_data = data.get("mx_records", [])
+        if mx_data:
+            _write_sheet(workbook, 'MX Records', ["Domain", "MX Server"], ((mx.get("domain"), mx.get("mx_server")) for mx in mx_data))
     
-    # 2.5 MX Records
-    mx_data = data.get("mx_records", [])
-    df_mx = pd.DataFrame(mx_data)
-    if not df_mx.empty:
-        df_mx.columns = ["Domain", "MX Server"]
+        # 2.8 Emails Data
+        emails = data.get("emails", [])
+        if emails:
+            _write_sheet(workbook, 'Emails', ["Email"], ((e,) for e in emails))
     
-    # 2.8 Emails Data
-    df_emails = pd.DataFrame(data.get("emails", []), columns=["Email"])
+        # 3. HTTPX Data
+        _write_sheet(workbook, 'HTTPX', HTTPX_EXPORT_HEADERS, (_httpx_row(host) for host in data.get("live_hosts", [])))
     
-    # 3. HTTPX Data
-    # Flatten the dict structure for DataFrame
-    httpx_rows = []
-    for host in data.get("live_hosts", []):
-         httpx_rows.append({
-             "URL": host.get("url"),
-             "Status Code": host.get("status_code"),
-             "Title": host.get("title"),
-             "Webserver": host.get("webserver"),
-             "Tech": ", ".join(host.get("tech", [])) if host.get("tech") else "",
-             "Host": host.get("host"),
-             "IP": host.get("ip"), # Added IP column
-             "Port": host.get("port")
-         })
-    df_httpx = pd.DataFrame(httpx_rows)
+        # 4. Nuclei Data
+        _write_sheet(workbook, 'Nuclei', NUCLEI_EXPORT_HEADERS, (_nuclei_row(vuln) for vuln in data.get("vulnerabilities", [])))
     
-    # 4. Nuclei Data
-    nuclei_rows = []
-    for vuln in data.get("vulnerabilities", []):
-        info = vuln.get("info", {})
-        classification = info.get("classification", {})
-        nuclei_rows.append({
-            "Name": info.get("name", vuln.get("template_id")),
-            "Severity": info.get("severity"),
-            "Matched At": vuln.get("matched_at"),
-            "Host": vuln.get("host"),
-            "Type": vuln.get("type"),
-            "Matcher Name": ", ".join(vuln.get("matchers", [])) if vuln.get("matchers") else vuln.get("matcher_name"),
-            "Extracted Results": ", ".join(vuln.get("extracted_results_list", [])) if vuln.get("extracted_results_list") else (", ".join(vuln.get("extracted_results", [])) if isinstance(vuln.get("extracted_results"), list) else vuln.get("extracted_results")),
-            "CVE ID": classification.get("cve_id"),
-            "CVSS Score": classification.get("cvss_score"),
-            "Description": info.get("description")
-        })
-    df_nuclei = pd.DataFrame(nuclei_rows)
+        workbook.close()
+        return open(export_path, 'rb')
+    finally:
+        os.unlink(export_path)
+
+def _read_chunks(export_file: BinaryIO) -> Iterator[bytes]:
+    with export_file:
+        while chunk := export_file.read(EXPORT_CHUNK_SIZE):
+            yield chunk
+
+@app.get("/export/{scan_id}")
+async def export_scan_result(scan_id: str):
+    if not _valid_uuid(scan_id):
+        raise HTTPException(status_code=400, detail="Invalid scan ID")
+    # A single lookup: a concurrent prune may drop the entry at any point
+    scan_data = SCAN_RESULTS.get(scan_id)
+    if scan_data is None:
+        raise HTTPException(status_code=404, detail="Scan not found")
     
-    # Create Excel file in memory
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df_summary.to_excel(writer, sheet_name='Summary', index=False)
-        df_subdomains.to_excel(writer, sheet_name='subfinder + amass', index=False)
-        if not df_mx.empty:
-             df_mx.to_excel(writer, sheet_name='MX Records', index=False)
-        if not df_emails.empty:
-             df_emails.to_excel(writer, sheet_name='Emails', index=False)
-        df_httpx.to_excel(writer, sheet_name='HTTPX', index=False)
-        df_nuclei.to_excel(writer, sheet_name='Nuclei', index=False)
+    if scan_data["status"] not in ["discovery_completed", "scan_completed"] or not scan_data["data"]:
+         raise HTTPException(status_code=400, detail="Scan not completed yet")
     
-    output.seek(0)
+    export_file = await run_in_threadpool(_build_xlsx, scan_data["data"], scan_data["domain"])
     
-    headers = {
-        'Content-Disposition': f'attachment; filename="scan_results_{scan_data["domain"]}.xlsx"'
-    }
-    return StreamingResponse(output, headers=headers, media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    # Starlette reads the chunks on its threadpool
+    return StreamingResponse(
+        _read_chunks(export_file),
+        media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        headers={
+            "Content-Disposition": f'attachment; filename="scan_results_{scan_data["domain"]}.xlsx"',
+            "Content-Length": str(os.fstat(export_file.fileno()).st_size)
+        }
+    )
 
 # Serve static files (production mode)
 # In local dev, we use Vite proxy. In docker, we serve from dist.
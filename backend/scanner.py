@@ -1,82 +1,389 @@
 import subprocess
 import shutil
-import json
+import functools
+import itertools
 import logging
 import os
 import re
-import uuid
+import shlex
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-from typing import List, Dict, Any, Tuple, Callable
+try:
+    import orjson as fast_json
+except ImportError:
+    # orjson is listed in requirements.txt; stdlib json keeps the scanner usable without it
+    import json as fast_json
+
+from typing import List, Dict, Any, Tuple, Callable, Iterable, Iterator, Optional
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# CPUs this process may actually run on. In a container with a cpuset this is
+# smaller than os.cpu_count(), which reports every core of the host.
+AVAILABLE_CPUS = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+
+# Large httpx target lists are split across parallel tool processes (nuclei only
+# when its rate limit needs more than one process, see NUCLEI_PROCESS_RATE).
+# A shard is only created per MIN_SHARD_SIZE targets so small scans keep a single process.
+MAX_SHARDS = max(1, int(os.getenv("OSINT_SHARDS", str(AVAILABLE_CPUS))))
+MIN_SHARD_SIZE = max(1, int(os.getenv("OSINT_MIN_SHARD_SIZE", "250")))
+# Total Nuclei requests per second, shared by all shards of a scan
+NUCLEI_RATE_LIMIT = max(1, int(os.getenv("OSINT_NUCLEI_RATE_LIMIT", "50")))
+# Requests per second a single nuclei process sustains at the default -c/-bulk-size;
+# nuclei is only sharded when NUCLEI_RATE_LIMIT is above this
+NUCLEI_PROCESS_RATE = 150
+# Per-process nuclei template concurrency and hosts per template. These are passed
+# explicitly rather than left to nuclei.
+NUCLEI_CONCURRENCY = max(1, int(os.getenv("OSINT_NUCLEI_CONCURRENCY", "25")))
+NUCLEI_BULK_SIZE = max(1, int(os.getenv("OSINT_NUCLEI_BULK_SIZE", "25")))
+# Seconds between nuclei progress reports
+NUCLEI_STATS_INTERVAL = 10
+# Live hosts between httpx progress reports
+HTTPX_PROGRESS_EVERY = 25
+
+# Domains accepted for discovery. The leading alphanumeric also keeps a value such
+# as "-h" from being read as a flag by the tools it is passed to.
+DOMAIN_PATTERN = re.compile(r'[a-z0-9][a-z0-9.-]{0,252}', re.IGNORECASE)
+
+# Output parsing patterns, compiled once at import
+# Amass MX line: truelight.org.sg (FQDN) --> mx_record --> alt1.aspmx.l.google.com (FQDN)
+MX_RECORD_PATTERN = re.compile(r'(.+?)\s+\(FQDN\)\s+-->\s+mx_record\s+-->\s+(.+?)\s+\(FQDN\)')
+# Emails in theHarvester's stdout
+EMAIL_PATTERN = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+# Stricter variant for Exiftool metadata, which is full of partial matches:
+# \b[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,6}\b, split around the '@' for find_strict_emails
+EMAIL_LOCAL_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789._%+-")
+EMAIL_DOMAIN_PATTERN = re.compile(r'[a-zA-Z0-9.-]+\.[a-zA-Z]{2,6}\b')
+
+# Read buffer for the Amass output file: multi-MB results in a few reads instead of 8 KiB at a time
+AMASS_READ_BUFFER = 1 << 20
+# Amass output files below this size are read in one go and split on newlines
+AMASS_READ_ALL_MAX = 32 << 20
+
+# Targets written to a tool's stdin per writelines() call
+STDIN_BATCH_LINES = 1024
+
+# Nuclei emits the same few dozen kebab-case field names on every finding, so
+# each name is translated to snake_case once and looked up afterwards.
+# Names without a hyphen (most of them) map to themselves, and the kebab-case
+# fields of nuclei's JSON schema are seeded up front.
+KEBAB_TO_SNAKE = str.maketrans("-", "_")
+NORMALIZED_KEYS: Dict[str, str] = {
+    key: key.translate(KEBAB_TO_SNAKE)
+    for key in (
+        "template-id", "template-path", "template-url", "matched-at", "matcher-name",
+        "matcher-status", "extracted-results", "curl-command", "matched-line"
+    )
+}
+
+def is_valid_domain(domain: str) -> bool:
+    # fullmatch rather than match() with "$", which would let a trailing newline through
+    return bool(DOMAIN_PATTERN.fullmatch(domain))
+
+def normalize_hosts(*sources: Iterable[str]) -> set:
+    # Strips and lowercases host names from several tools into one set, so e.g.
+    # Foo.example.com and foo.example.com are probed once
+    hosts = set()
+    for source in sources:
+        hosts.update(filter(None, (name.strip().lower() for name in source)))
+    return hosts
+
+def shard_targets(targets: List[str], max_shards: int = MAX_SHARDS) -> List[List[str]]:
+    # Contiguous, near-equal slices: concatenating the shards' results in order
+    # keeps targets in the order they were given, as with a single process
+    count = max(1, min(max_shards, len(targets) // MIN_SHARD_SIZE))
+    size, extra = divmod(len(targets), count)
+    shards = []
+    start = 0
+    for i in range(count):
+        end = start + size + (1 if i < extra else 0)
+        shards.append(targets[start:end])
+        start = end
+    return shards
+
+# Tool locations and the templates directory cannot change while the process
+# runs, so they are resolved once instead of on every Scanner() construction.
+@functools.lru_cache(maxsize=None)
+def which(tool_name: str) -> Optional[str]:
+    return shutil.which(tool_name)
+
+@functools.lru_cache(maxsize=None)
+def get_binary_path(tool_name: str) -> str:
+    # Prioritize Go bin paths (Docker environment)
+    # Verify both existence and execution permission
+    go_path = f"/go/bin/{tool_name}"
+    if os.path.exists(go_path) and os.access(go_path, os.X_OK):
+        return go_path
+    
+    # Fallback to standard PATH lookup
+    return which(tool_name) or tool_name
+
+@functools.lru_cache(maxsize=1)
+def theharvester_command() -> Tuple[str, ...]:
+    # Path Logic: Prefer strict source execution to avoid entrypoint issues
+    # We cloned it to /app/theHarvester
+    source_path = "/app/theHarvester/theHarvester.py"
+    if os.path.exists(source_path):
+        logger.info(f"Using theHarvester source script: {source_path}")
+        return ("python3", source_path)
+    theharvester_path = which("theHarvester")
+    if not theharvester_path:
+        # Fallback if not found and system binary missing
+        logger.warning("theHarvester source not found. Falling back to module.")
+        return ("python3", "-m", "theHarvester")
+    return (theharvester_path,)
+
+@functools.lru_cache(maxsize=1)
+def find_templates_dir() -> str:
+    # Common default locations for nuclei templates in Docker
+    # dict.fromkeys drops the ~ entry when it is /root/nuclei-templates again (HOME=/root)
+    potential_paths = dict.fromkeys([
+        "/app/nuclei-templates",
+        "/root/nuclei-templates",
+        "/root/.nuclei-templates",
+        "/root/.local/nuclei-templates",
+        os.path.expanduser("~/nuclei-templates")
+    ])
+    
+    for path in potential_paths:
+        if os.path.isdir(path):
+            logger.info(f"Found Nuclei templates at: {path}")
+            return path
+    
+    logger.warning("Could not find Nuclei templates directory. Scans may fail if paths are relative.")
+    return ""
+
+@functools.lru_cache(maxsize=None)
+def nuclei_template_args(templates_dir: str) -> Tuple[str, ...]:
+    # Construct template paths once; the templates checkout does not move while we run
+    # To ensure no findings are missed, we should scan the entire 'http' directory if it exists,
+    # rather than cherry-picking subfolders like cves/ or misconfiguration/.
+    if templates_dir:
+        http_path = os.path.join(templates_dir, "http")
+        
+        if os.path.exists(http_path):
+            # Best case: Scan all HTTP templates
+            logger.info(f"Using full HTTP template collection at: {http_path}")
+            return ("-t", http_path)
+        
+        # Fallback: Just use the root templates dir and let Nuclei decide
+        # output might include dns/ssl/file/etc but ensures we don't miss anything.
+        logger.info(f"HTTP folder not found. Using root templates dir: {templates_dir}")
+        return ("-t", templates_dir)
+    
+    # Fallback to defaults or relative if not found
+    return ("-t", "cves/", "-t", "vulnerabilities/", "-t", "misconfiguration/", "-t", "exposures/", "-t", "miscellaneous/")
+
+def append_unique(values: List[Any], seen: set, value: Any):
+    # Appends value unless already present, using `seen` for an O(1) membership test.
+    # Unhashable values (e.g. dicts from extractors) are tracked by their JSON encoding.
+    try:
+        hash(value)
+        marker = value
+    except TypeError:
+        marker = fast_json.dumps(value)
+    if marker not in seen:
+        seen.add(marker)
+        values.append(value)
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+def find_strict_emails(text: str) -> set:
+    # Returns the same emails as findall() of the strict pattern above, but only
+    # looks at the text around each '@' instead of trying a match at every offset
+    # of a multi-MB Exiftool dump.
+    emails = set()
+    # Matches never overlap, so a local part cannot reach back into the previous one
+    floor = 0
+    at = text.find("@")
+    while at != -1:
+        start = at
+        while start > floor and text[start - 1] in EMAIL_LOCAL_CHARS:
+            start -= 1
+        # The leading \b: skip ahead to the first offset that is a word boundary
+        while start < at and (start > 0 and _is_word_char(text[start - 1])) == _is_word_char(text[start]):
+            start += 1
+        if start < at:
+            domain_match = EMAIL_DOMAIN_PATTERN.match(text, at + 1)
+            if domain_match:
+                emails.add(text[start:domain_match.end()])
+                floor = domain_match.end()
+                at = text.find("@", floor)
+                continue
+        at = text.find("@", at + 1)
+    return emails
+
+def aggregate_finding(aggregated_results: Dict[Tuple[str, str], Dict[str, Any]], item: Dict[str, Any]):
+    """
+    Merges one normalized nuclei finding into aggregated_results as it is parsed.
+    """
+    # Create a unique key based on template_id and where it matched
+    # We use the template_id and matched_at as the primary key
+    # Some templates might match same URL multiple times with different matchers
+    key = (item.get("template_id", ""), item.get("matched_at", ""))
+
+    entry = aggregated_results.get(key)
+    if entry is None:
+        # The first occurrence becomes the entry itself: each finding is a fresh dict
+        # parsed from its own line, so it is extended in place rather than copied.
+        # The _seen sets keep the merges below O(1) per finding; the lists keep first-seen order
+        entry = aggregated_results[key] = item
+        matchers = entry["matchers"] = []
+        extracted_list = entry["extracted_results_list"] = []
+        matchers_seen = entry["_matchers_seen"] = set()
+        extracted_seen = entry["_extracted_seen"] = set()
+    else:
+        matchers = entry["matchers"]
+        extracted_list = entry["extracted_results_list"]
+        matchers_seen = entry["_matchers_seen"]
+        extracted_seen = entry["_extracted_seen"]
+
+    # Merge matcher_name
+    matcher = item.get("matcher_name")
+    if matcher:
+        append_unique(matchers, matchers_seen, matcher)
+
+    # Merge extracted_results
+    extracted = item.get("extracted_results")
+    if extracted:
+        if isinstance(extracted, list):
+            for ex in extracted:
+                append_unique(extracted_list, extracted_seen, ex)
+        else:
+            append_unique(extracted_list, extracted_seen, extracted)
+
+class StreamedProcess:
+    """
+    Runs a command and yields its stdout line by line while it is still running.
+    stdin is fed and stderr drained on helper threads so that no pipe can fill up
+    and stall the child. returncode and stderr are set once iteration finishes.
+
+    The pipes are kept in bytes: lines are yielded undecoded (orjson parses bytes
+    directly) and stderr is only decoded if something actually reads .stderr.
+
+    stderr_filter, if given, sees each stripped stderr line as it arrives; lines it
+    returns True for are consumed (e.g. progress reports) and left out of stderr.
+    """
+
+    def __init__(self, cmd: List[str], input_lines: Optional[Iterable[str]] = None,
+                 stderr_filter: Optional[Callable[[bytes], bool]] = None):
+        self.returncode = None
+        self.stderr_bytes = b""
+        self._stderr_chunks: List[bytes] = []
+        self._stderr_filter = stderr_filter
+        # Set if the stdin writer fails for any reason other than the child going away
+        self._stdin_error: Optional[BaseException] = None
+        self._proc = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE if input_lines is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            # 64 KiB reads: several NDJSON findings per syscall instead of the 8 KiB default
+            bufsize=1 << 16,
+            # Descriptors are non-inheritable by default, so nothing but the pipes above
+            # reaches the child anyway. Without close_fds (and with no preexec_fn, cwd or
+            # env override) CPython launches via posix_spawn instead of fork+exec.
+            close_fds=False
+        )
+        self._threads = [threading.Thread(target=self._drain_stderr, daemon=True)]
+        if input_lines is not None:
+            self._threads.append(threading.Thread(target=self._feed_stdin, args=(input_lines,), daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def _feed_stdin(self, input_lines: Iterable[str]):
+        # Write in batches of lines rather than one joined buffer, so memory stays
+        # flat for huge target lists and the child can start on the first batch.
+        lines = iter(input_lines)
+        try:
+            while True:
+                batch = list(itertools.islice(lines, STDIN_BATCH_LINES))
+                if not batch:
+                    break
+                self._proc.stdin.writelines(b"%s\n" % line.encode() for line in batch)
+        except BrokenPipeError:
+            # The child exited (or was killed) before reading all of its input
+            pass
+        except Exception as e:
+            # e.g. a target that cannot be encoded; re-raised to the consumer by __iter__
+            self._stdin_error = e
+        finally:
+            # Always send EOF, otherwise the child waits for more input forever
+            try:
+                self._proc.stdin.close()
+            except (BrokenPipeError, ValueError):
+                pass
+
+    def _drain_stderr(self):
+        if self._stderr_filter is None:
+            self._stderr_chunks.append(self._proc.stderr.read())
+            return
+        for line in self._proc.stderr:
+            try:
+                if self._stderr_filter(line.strip()):
+                    continue
+            except Exception:
+                # Never let a bad filter stop draining, or the child would block on a full pipe
+                logger.exception("stderr filter failed")
+            self._stderr_chunks.append(line)
+
+    def __iter__(self) -> Iterator[bytes]:
+        finished = False
+        try:
+            for line in self._proc.stdout:
+                yield line
+            finished = True
+        finally:
+            if not finished:
+                # Consumer stopped early: don't leave the tool running in the background
+                self._proc.kill()
+            self._proc.stdout.close()
+            self.returncode = self._proc.wait()
+            for thread in self._threads:
+                thread.join()
+            self.stderr_bytes = b"".join(self._stderr_chunks)
+        if self._stdin_error is not None:
+            # The child only saw part of its input, so its output is incomplete
+            raise self._stdin_error
+
+    @property
+    def stderr(self) -> str:
+        return self.stderr_bytes.decode(errors="replace")
+
 class Scanner:
     def __init__(self):
-        self.subfinder_path = self._get_binary_path("subfinder")
-        self.amass_path = self._get_binary_path("amass")
-        self.httpx_path = self._get_binary_path("httpx")
-        self.nuclei_path = self._get_binary_path("nuclei")
-        self.theharvester_path = shutil.which("theHarvester") or "theHarvester"
+        self.subfinder_path = get_binary_path("subfinder")
+        self.amass_path = get_binary_path("amass")
+        self.httpx_path = get_binary_path("httpx")
+        self.nuclei_path = get_binary_path("nuclei")
         self.metagoofil_path = "/app/metagoofil/metagoofil.py" 
-        self.exiftool_path = shutil.which("exiftool") or "exiftool"
-        self.templates_dir = self._find_templates_dir()
-
-
-
-
-
-    def _get_binary_path(self, tool_name: str) -> str:
-        # Prioritize Go bin paths (Docker environment)
-        # Verify both existence and execution permission
-        go_path = f"/go/bin/{tool_name}"
-        if os.path.exists(go_path) and os.access(go_path, os.X_OK):
-            return go_path
-        
-        # Fallback to standard PATH lookup
-        return shutil.which(tool_name) or tool_name
-
-
-    def _find_templates_dir(self) -> str:
-        # Common default locations for nuclei templates in Docker
-        potential_paths = [
-            "/app/nuclei-templates",
-            "/root/nuclei-templates",
-            "/root/.nuclei-templates",
-            "/root/.local/nuclei-templates",
-            os.path.expanduser("~/nuclei-templates")
-        ]
-        
-        for path in potential_paths:
-            if os.path.exists(path):
-                logger.info(f"Found Nuclei templates at: {path}")
-                return path
-        
-        logger.warning("Could not find Nuclei templates directory. Scans may fail if paths are relative.")
-        return ""
+        self.exiftool_path = which("exiftool") or "exiftool"
+        self.templates_dir = find_templates_dir()
+        self.template_args = nuclei_template_args(self.templates_dir)
 
     def run_subfinder(self, domain: str) -> List[str]:
         logger.info(f"Running Subfinder on {domain}")
-        try:
-            process = subprocess.run(
-                [self.subfinder_path, "-d", domain, "-all", "-recursive", "-silent"],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            subdomains = process.stdout.strip().split('\n')
-            # Filter empty strings
-            subdomains = [s for s in subdomains if s]
-            logger.info(f"Found {len(subdomains)} subdomains for {domain}")
-            return subdomains
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Subfinder failed: {e.stderr}")
+        process = StreamedProcess([self.subfinder_path, "-d", domain, "-all", "-recursive", "-silent"])
+        # Filter empty lines and drop duplicates (-all reports the same host from several sources)
+        unique_lines = dict.fromkeys(filter(None, (raw.strip() for raw in process)))
+        subdomains = [line.decode(errors="replace") for line in unique_lines]
+        if process.returncode != 0:
+            logger.error(f"Subfinder failed: {process.stderr}")
             return []
+        logger.info(f"Found {len(subdomains)} subdomains for {domain}")
+        return subdomains
 
     def run_amass(self, domain: str) -> Tuple[List[str], List[Dict[str, str]]]:
         logger.info(f"Running Amass on {domain}")
-        output_file = f"amass_results_{uuid.uuid4()}.txt"
+        # Scratch files live in a private temp directory (tmpfs in most containers)
+        # that is removed as a whole, whatever happens below
+        scratch_dir = tempfile.mkdtemp(prefix="amass_")
+        output_file = os.path.join(scratch_dir, "amass_results.txt")
         
         try:
             # Command: amass enum -active -brute -d target.com -o amass_results.txt
@@ -88,7 +395,8 @@ class Scanner:
                 "-o", output_file
             ]
             
-            logger.info(f"Executing Amass command: {' '.join(cmd)}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Executing Amass command: %s", shlex.join(cmd))
             
             process = subprocess.run(
                 cmd,
@@ -101,83 +409,85 @@ class Scanner:
                 # Log stderr, though amass often prints to stdout or the log file
                 logger.error(f"Amass stderr: {process.stderr}")
 
-            raw_lines = []
-            if os.path.exists(output_file):
-                with open(output_file, 'r') as f:
-                    raw_lines = [line.strip() for line in f if line.strip()]
-                
-                # Cleanup
-                os.remove(output_file)
-            else:
-                logger.warning("Amass output file was not created.")
-
             # Parse Results
-            subdomains = []
+            subdomains = set()
             mx_records = []
             
-            # Regex patterns
-            # Pattern for MX: truelight.org.sg (FQDN) --> mx_record --> alt1.aspmx.l.google.com (FQDN)
-            mx_pattern = re.compile(r'(.+?)\s+\(FQDN\)\s+-->\s+mx_record\s+-->\s+(.+?)\s+\(FQDN\)')
+            # MX relationship lines are matched with MX_RECORD_PATTERN
             # Pattern for simple subdomain (loose check, just exclude arrows)
             # Lines with arrows are relationships, not direct subdomains list items (unless we parse left side)
             # Amass output can be mixed. We will assume any line NOT matching the relationship pattern 
             # AND looking like a domain is a subdomain.
             # However, in arrow lines, the left side IS a subdomain.
             
-            for line in raw_lines:
-                # Check MX record
-                mx_match = mx_pattern.match(line)
-                if mx_match:
-                    src_domain = mx_match.group(1).strip()
-                    mx_server = mx_match.group(2).strip()
-                    mx_records.append({"domain": src_domain, "mx_server": mx_server})
-                    
-                    # Also add the source domain to subdomains list if valid
-                    subdomains.append(src_domain)
-                    continue
-                
-                # Skip other relationship lines (e.g. ns_record, ptr_record) to avoid polluting subdomains
-                if " --> " in line:
-                    continue
+            if os.path.exists(output_file):
+                with open(output_file, 'r', buffering=AMASS_READ_BUFFER) as f:
+                    # Typical outputs are split in one C-level pass; very large ones are
+                    # iterated line by line so they are never held in memory whole.
+                    # split("\n") rather than splitlines(), which also breaks on \x0b,
+                    # \x85, \u2028 and friends where file iteration does not; text mode
+                    # has already translated \r\n
+                    if os.path.getsize(output_file) < AMASS_READ_ALL_MAX:
+                        lines = f.read().split("\n")
+                    else:
+                        lines = f
+                    for line in lines:
+                        line = line.strip()
+                        if not line:
+                            continue
+
+                        # Most lines are plain subdomains; the regex below can only match
+                        # lines with an arrow, so those skip it with a substring check
+                        if "-->" not in line:
+                            subdomains.add(line)
+                            continue
+
+                        # Check MX record
+                        mx_match = MX_RECORD_PATTERN.match(line) if "mx_record" in line else None
+                        if mx_match:
+                            src_domain = mx_match.group(1).strip()
+                            mx_server = mx_match.group(2).strip()
+                            mx_records.append({"domain": src_domain, "mx_server": mx_server})
+                            
+                            # Also add the source domain to subdomains list if valid
+                            subdomains.add(src_domain)
+                            continue
+                        
+                        # Skip other relationship lines (e.g. ns_record, ptr_record) to avoid polluting subdomains
+                        if " --> " in line:
+                            continue
 
-                # Plain subdomain line
-                subdomains.append(line)
+                        # Plain subdomain line
+                        subdomains.add(line)
+            else:
+                logger.warning("Amass output file was not created.")
 
-            # Deduplicate locally
-            subdomains = list(set(subdomains))
+            # The set already deduplicated them locally
+            subdomains = list(subdomains)
             logger.info(f"Amass found {len(subdomains)} subdomains and {len(mx_records)} MX records for {domain}")
             return subdomains, mx_records
 
         except Exception as e:
             logger.exception(f"Amass failed: {e}")
-            if os.path.exists(output_file):
-                os.remove(output_file)
             return [], []
+        finally:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
 
 
             
     def run_theharvester(self, domain: str) -> Tuple[List[str], List[str]]:
         logger.info(f"Running theHarvester on {domain}")
-        output_file = f"theharvester_results_{uuid.uuid4()}" 
+        scratch_dir = tempfile.mkdtemp(prefix="theharvester_")
+        output_file = os.path.join(scratch_dir, "theharvester_results")
         
         try:
-            cmd = [self.theharvester_path]
-            
-            # Path Logic: Prefer strict source execution to avoid entrypoint issues
-            # We cloned it to /app/theHarvester
-            source_path = "/app/theHarvester/theHarvester.py"
-            if os.path.exists(source_path):
-                 logger.info(f"Using theHarvester source script: {source_path}")
-                 cmd = ["python3", source_path]
-            elif self.theharvester_path == "theHarvester" and not shutil.which("theHarvester"):
-                 # Fallback if not found and system binary missing
-                 logger.warning("theHarvester source not found. Falling back to module.")
-                 cmd = ["python3", "-m", "theHarvester"]
+            cmd = list(theharvester_command())
 
             # Sources configured for v4.10.0 (removed unsupported ones like threatminer, bing, etc)
             sources = "baidu,crtsh,duckduckgo,hackertarget,rapiddns,subdomaincenter,subdomainfinderc99,thc,urlscan,yahoo"
             cmd.extend(["-d", domain, "-b", sources, "-l", "500", "-f", output_file])
-            logger.info(f"Executing theHarvester command: {' '.join(cmd)}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Executing theHarvester command: %s", shlex.join(cmd))
             
             process = subprocess.run(cmd, capture_output=True, text=True)
             
@@ -185,32 +495,30 @@ class Scanner:
             json_output_path = f"{output_file}.json"
             xml_output_path = f"{output_file}.xml"
             
-            emails = []
-            hosts = []
+            # Sets from the start so duplicates are dropped as they are collected
+            emails = set()
+            hosts = set()
             
             if os.path.exists(json_output_path):
-                with open(json_output_path, 'r') as f:
+                with open(json_output_path, 'rb') as f:
                     try:
-                        data = json.load(f)
-                        emails = data.get("emails", []) or []
-                        hosts = data.get("hosts", []) or []
-                    except json.JSONDecodeError:
+                        data = fast_json.loads(f.read())
+                        emails.update(data.get("emails", []) or [])
+                        hosts.update(data.get("hosts", []) or [])
+                    except fast_json.JSONDecodeError:
                         logger.error("Failed to parse theHarvester JSON output")
-                os.remove(json_output_path)
             elif os.path.exists(xml_output_path):
-                os.remove(xml_output_path)
                 logger.warning("theHarvester produced XML. Parsing skipped.")
             else:
                  logger.warning("theHarvester output file not found. attempting to parse stdout.")
-                 email_pattern = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
-                 raw_emails = email_pattern.findall(process.stdout)
+                 raw_emails = EMAIL_PATTERN.findall(process.stdout)
                  
                  # Filter out tool noise (author emails, defaults)
                  excluded_emails = {"cmartorella@edge-security.com"}
-                 emails = [e for e in raw_emails if e.lower() not in excluded_emails and "example.com" not in e]
+                 emails.update(e for e in raw_emails if e.lower() not in excluded_emails and "example.com" not in e)
 
-            emails = list(set(emails))
-            hosts = list(set(hosts))
+            emails = list(emails)
+            hosts = list(hosts)
             
             # Debugging: Log warning if no results found
             if not emails and not hosts:
@@ -229,10 +537,9 @@ class Scanner:
             
         except Exception as e:
             logger.exception(f"theHarvester failed: {e}")
-            for ext in ['.json', '.xml']:
-                if os.path.exists(f"{output_file}{ext}"):
-                    os.remove(f"{output_file}{ext}")
             return [], []
+        finally:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
 
 
 
@@ -242,12 +549,11 @@ class Scanner:
             logger.warning(f"Metagoofil not found at {self.metagoofil_path}. Skipping.")
             return []
             
-        if not shutil.which("exiftool"):
+        if not which("exiftool"):
             logger.warning("Exiftool not found. Skipping Metagoofil processing.")
             return []
 
-        temp_dir = f"metagoofil_{uuid.uuid4()}"
-        os.makedirs(temp_dir, exist_ok=True)
+        temp_dir = tempfile.mkdtemp(prefix="metagoofil_")
         
         try:
             # 1. Download files
@@ -260,7 +566,8 @@ class Scanner:
                 "-o", temp_dir,
                 "-w"
             ]
-            logger.info(f"Executing Metagoofil Download: {' '.join(cmd_download)}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Executing Metagoofil Download: %s", shlex.join(cmd_download))
             
             subprocess.run(
                 cmd_download,
@@ -269,14 +576,14 @@ class Scanner:
                 check=False # Don't crash if it fails to find files
             )
             
-            # Check if any files were downloaded
-            files = os.listdir(temp_dir)
-            if not files:
+            # Check if any files were downloaded; only the count is needed, not a name list
+            with os.scandir(temp_dir) as entries:
+                file_count = sum(1 for _ in entries)
+            if not file_count:
                 logger.info("Metagoofil found no files to download.")
-                shutil.rmtree(temp_dir, ignore_errors=True)
                 return []
                 
-            logger.info(f"Metagoofil downloaded {len(files)} files. Extracting metadata...")
+            logger.info(f"Metagoofil downloaded {file_count} files. Extracting metadata...")
 
             # 2. Extract Metadata with Exiftool
             cmd_exif = [self.exiftool_path, "-r", temp_dir]
@@ -289,20 +596,9 @@ class Scanner:
             
             # 3. Parse Emails from Exiftool output
             # Use stricter regex as suggested by user to avoid partial matches
-            # Pattern: \b[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,6}\b
-            email_pattern = re.compile(r'\b[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,6}\b')
-            emails = email_pattern.findall(process.stdout)
-            
-            # Filter garbage (common in metadata)
-            cleaned_emails = []
-            for email in emails:
-                if domain in email: # Optional: Strict mode? No, let's keep all valid looking emails
-                    cleaned_emails.append(email)
-                else:
-                    # Still keep it, might be third party provider
-                    cleaned_emails.append(email)
-
-            cleaned_emails = list(set(cleaned_emails))
+            # Every valid looking email is kept, on-domain or not (might be a third party
+            # provider); the set only drops the duplicates
+            cleaned_emails = list(find_strict_emails(process.stdout))
             logger.info(f"Metagoofil/Exiftool found {len(cleaned_emails)} emails")
             
             return cleaned_emails
@@ -311,19 +607,51 @@ class Scanner:
             logger.exception(f"Metagoofil failed: {e}")
             return []
         finally:
-            if os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir, ignore_errors=True)
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def _iter_httpx_shard(self, cmd: List[str], hosts: List[str]) -> Iterator[Dict[str, Any]]:
+        # Targets are fed over stdin by StreamedProcess's writer thread, so a large
+        # input cannot deadlock against httpx filling its stdout pipe.
+        process = StreamedProcess(cmd, hosts)
+
+        # Bound once so the per-line loop does not repeat the attribute lookup
+        loads = fast_json.loads
+        for line in process:
+            line = line.strip()
+            if line:
+                try:
+                    data = loads(line)
+                    # Normalize IP: httpx might return 'ip' (string) or 'a' (list of IPs)
+                    # If 'ip' is missing but 'a' exists, use the first A record.
+                    if "ip" not in data or not data["ip"]:
+                        if "a" in data and isinstance(data["a"], list) and len(data["a"]) > 0:
+                            data["ip"] = data["a"][0]
+                        else:
+                            data["ip"] = None # Explicitly set to None if missing
+                    
+                    yield data
+                except fast_json.JSONDecodeError as e:
+                    logger.warning(f"Failed to parse HTTPX line: {line.decode(errors='replace')}. Error: {e}")
+                    continue
+        
+        if process.stderr_bytes:
+             logger.info(f"HTTPX Stderr: {process.stderr}")
 
     def run_httpx(self, subdomains: List[str]) -> List[Dict[str, Any]]:
+        return list(self.iter_httpx(subdomains))
+
+    def iter_httpx(self, subdomains: List[str]) -> Iterator[Dict[str, Any]]:
+        """
+        Yields live hosts as httpx reports them. run_httpx collects them into a list.
+        Subdomains are expected stripped and lowercased, as run_discovery passes them.
+        """
         logger.info(f"Running HTTPX on {len(subdomains)} subdomains")
         if not subdomains:
-            return []
+            return
         
         try:
-            # Clean inputs rigorously
-            cleaned_subdomains = [s.strip().lower() for s in subdomains if s.strip()]
-            input_str = "\n".join(cleaned_subdomains)
-            logger.info(f"HTTPX Input:\n{input_str}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("HTTPX Input:\n%s", "\n".join(subdomains))
             
             # Optimized Command for Docker Environment
             # Note: -ip and custom ports (8080/8443) are disabled as they caused network failures in this specific container setup.
@@ -337,219 +665,231 @@ class Scanner:
                 "-retries", "2",
                 "-timeout", "10",
                 "-random-agent",
+                # Skip the per-launch update check (a network round-trip every time httpx starts)
+                "-duc",
             ]
-            logger.info(f"Executing HTTPX command (Stable): {' '.join(cmd)}")
-            
-            # Use temporary file for input instead of stdin to avoid potential pipe issues
-            input_file = f"httpx_input_{uuid.uuid4()}.txt"
-            with open(input_file, "w") as f:
-                f.write(input_str)
-            
-            cmd.extend(["-l", input_file])
-            
-            process = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=False
-            )
-            
-            if os.path.exists(input_file):
-                os.remove(input_file)
-            
-            if process.stderr:
-                 logger.info(f"HTTPX Stderr: {process.stderr}")
-            
-
-
-            results = []
-            for line in process.stdout.strip().split('\n'):
-                if line:
-                    try:
-                        data = json.loads(line)
-                        # Normalize IP: httpx might return 'ip' (string) or 'a' (list of IPs)
-                        # If 'ip' is missing but 'a' exists, use the first A record.
-                        if "ip" not in data or not data["ip"]:
-                            if "a" in data and isinstance(data["a"], list) and len(data["a"]) > 0:
-                                data["ip"] = data["a"][0]
-                            else:
-                                data["ip"] = None # Explicitly set to None if missing
-                        
-                        results.append(data)
-                    except json.JSONDecodeError as e:
-                        logger.warning(f"Failed to parse HTTPX line: {line}. Error: {e}")
-                        continue
-            
-            logger.info(f"HTTPX found {len(results)} live hosts")
-            
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Executing HTTPX command (Stable): %s", shlex.join(cmd))
+            
+            shards = shard_targets(subdomains)
+            live_count = 0
+            if len(shards) == 1:
+                # A single process is streamed straight through to the caller
+                for host in self._iter_httpx_shard(cmd, shards[0]):
+                    live_count += 1
+                    yield host
+            else:
+                logger.info(f"Splitting HTTPX targets across {len(shards)} parallel processes")
+                with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+                    for shard_results in pool.map(lambda shard: list(self._iter_httpx_shard(cmd, shard)), shards):
+                        live_count += len(shard_results)
+                        yield from shard_results
 
-            
-            return results
+            logger.info(f"HTTPX found {live_count} live hosts")
         except subprocess.CalledProcessError as e:
             logger.error(f"HTTPX failed. Stderr: {e.stderr}")
             logger.error(f"HTTPX failed. Stdout: {e.stdout}")
-            return []
+
+    def _run_nuclei_shard(self, cmd: List[str], targets: List[str],
+                          on_finding: Callable[[Dict[str, Any]], None],
+                          on_stats: Callable[[Dict[str, Any]], None] = None) -> int:
+        def consume_stats(line: bytes) -> bool:
+            # -stats-json writes one JSON object per interval to stderr
+            if not line.startswith(b"{"):
+                return False
+            try:
+                stats = fast_json.loads(line)
+            except fast_json.JSONDecodeError:
+                return False
+            if on_stats:
+                on_stats(stats)
+            return True
+
+        # echo targets | nuclei -json -silent
+        process = StreamedProcess(cmd, targets, stderr_filter=consume_stats)
+
+        # Findings are parsed and handed to on_finding as nuclei emits them
+        finding_count = 0
+        # Bound once so the per-line loop does not repeat the attribute lookups
+        loads = fast_json.loads
+        cached_key = NORMALIZED_KEYS.get
+        cache_key = NORMALIZED_KEYS.setdefault
+        for line in process:
+            line = line.strip()
+            if line:
+                try:
+                    data = loads(line)
+                    # Normalize keys (kebab-case to snake_case)
+                    normalized_data = {
+                        (cached_key(k) or cache_key(k, k.translate(KEBAB_TO_SNAKE) if "-" in k else k)): v
+                        for k, v in data.items()
+                    }
+                    on_finding(normalized_data)
+                    finding_count += 1
+                except fast_json.JSONDecodeError as e:
+                    logger.warning(f"Failed to decode Nuclei JSON line: {line[:100].decode(errors='replace')}... Error: {e}")
+                    continue
+
+        if process.returncode != 0:
+            logger.error(f"Nuclei process failed with return code {process.returncode}")
+            # Log stderr but keep the partial results parsed above
+            logger.error(f"Stderr: {process.stderr}")
+            # Do NOT return [] here. We want to capture any partial findings.
+        
+        # The stderr of a long scan can run to kilobytes; only decode it when it is emitted
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Nuclei stderr output (info/warning): %s", process.stderr)
+        return finding_count
 
     def run_nuclei(self, targets: List[str], status_callback: Callable[[str], None] = None) -> List[Dict[str, Any]]:
+        return list(self.iter_nuclei(targets, status_callback))
+
+    def iter_nuclei(self, targets: List[str], status_callback: Callable[[str], None] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yields aggregated findings once every nuclei shard has finished.
+        run_nuclei collects them into a list.
+        """
         logger.info(f"Running Nuclei on {len(targets)} targets")
         if not targets:
-            return []
+            return
             
         try:
             if status_callback:
                 status_callback(f"Running Nuclei (Scanning {len(targets)} targets for vulnerabilities)...")
 
-            # echo targets | nuclei -json -silent
-            input_str = "\n".join(targets)
-            
-            # Construct template paths dynamically
-            # To ensure no findings are missed, we should scan the entire 'http' directory if it exists,
-            # rather than cherry-picking subfolders like cves/ or misconfiguration/.
-            template_args = []
-            if self.templates_dir:
-                 http_path = os.path.join(self.templates_dir, "http")
-                 
-                 if os.path.exists(http_path):
-                     # Best case: Scan all HTTP templates
-                     logger.info(f"Using full HTTP template collection at: {http_path}")
-                     template_args.extend(["-t", http_path])
-                 else:
-                     # Fallback: Just use the root templates dir and let Nuclei decide
-                     # output might include dns/ssl/file/etc but ensures we don't miss anything.
-                     logger.info(f"HTTP folder not found. Using root templates dir: {self.templates_dir}")
-                     template_args.extend(["-t", self.templates_dir])
-            else:
-                # Fallback to defaults or relative if not found
-                template_args.extend(["-t", "cves/", "-t", "vulnerabilities/", "-t", "misconfiguration/", "-t", "exposures/", "-t", "miscellaneous/"])
-
             cmd = [
                 self.nuclei_path,
-                *template_args,
+                *self.template_args,
                 "-severity", "unknown,info,low,medium,high,critical",
-                "-rl", "50",
-                "-j",
+                # One JSON object per finding; nuclei has no flag that groups matchers per
+                # (template, location), so that merge stays in aggregate_finding
+                "-jsonl",
                 "-silent",
-                "-nc"
+                "-nc",
+                # Skip the engine/template update check nuclei otherwise makes on every launch
+                "-duc",
+                # Template concurrency and hosts per template, independent of the rate limit
+                "-c", str(NUCLEI_CONCURRENCY),
+                "-bulk-size", str(NUCLEI_BULK_SIZE),
+                # Periodic JSON progress on stderr, surfaced through status_callback
+                "-stats", "-stats-json", "-stats-interval", str(NUCLEI_STATS_INTERVAL)
             ]
 
-            # Log the full command for debugging
-            logger.info(f"Executing Nuclei command: {' '.join(cmd)}")
-            
-            process = subprocess.run(
-                cmd,
-                input=input_str,
-                capture_output=True,
-                text=True
-            )
-            
-            if process.returncode != 0:
-                logger.error(f"Nuclei process failed with return code {process.returncode}")
-                # Log stderr but continue to parse stdout for partial results
-                logger.error(f"Stderr: {process.stderr}")
-                logger.debug(f"Stdout (partial potentially): {process.stdout}")
-                # Do NOT return [] here. We want to capture any partial findings.
-
-            results = []
-            for line in process.stdout.strip().split('\n'):
-                if line:
-                    try:
-                        data = json.loads(line)
-                        # Normalize keys (kebab-case to snake_case)
-                        normalized_data = {}
-                        for k, v in data.items():
-                            new_key = k.replace('-', '_')
-                            normalized_data[new_key] = v
-                        results.append(normalized_data)
-                    except json.JSONDecodeError as e:
-                        logger.warning(f"Failed to decode Nuclei JSON line: {line[:100]}... Error: {e}")
-                        continue
-            
-            logger.info(f"Nuclei stderr output (info/warning): {process.stderr}")
-            logger.info(f"Nuclei raw findings: {len(results)}")
-
-            # Aggregate results
-            aggregated_results = {}
-            for item in results:
-                # Create a unique key based on template_id and where it matched
-                # We use the template_id and matched_at as the primary key
-                # Some templates might match same URL multiple times with different matchers
-                template_id = item.get("template_id", "")
-                matched_at = item.get("matched_at", "")
-                
-                key = f"{template_id}|{matched_at}"
-
-                if key not in aggregated_results:
-                    # Initialize with the first occurrence
-                    aggregated_results[key] = item.copy()
-                    aggregated_results[key]["matchers"] = []
-                    aggregated_results[key]["extracted_results_list"] = []
-
-                # Merge matcher_name
-                matcher = item.get("matcher_name")
-                if matcher and matcher not in aggregated_results[key]["matchers"]:
-                    aggregated_results[key]["matchers"].append(matcher)
-
-                # Merge extracted_results
-                extracted = item.get("extracted_results")
-                if extracted:
-                    if isinstance(extracted, list):
-                        for ex in extracted:
-                            if ex not in aggregated_results[key]["extracted_results_list"]:
-                                aggregated_results[key]["extracted_results_list"].append(ex)
-                    else:
-                        if extracted not in aggregated_results[key]["extracted_results_list"]:
-                             aggregated_results[key]["extracted_results_list"].append(extracted)
+            # One process at -c/-bulk-size 25 already reaches the default rate limit,
+            # and every extra process loads the full template set, so only shard when
+            # NUCLEI_RATE_LIMIT is beyond what a single process can sustain. The
+            # limit is split across shards so the aggregate never exceeds it.
+            shards = shard_targets(targets, min(MAX_SHARDS, -(-NUCLEI_RATE_LIMIT // NUCLEI_PROCESS_RATE)))
+            shard_cmd = cmd + ["-rl", str(NUCLEI_RATE_LIMIT // len(shards))]
 
-            final_results = list(aggregated_results.values())
-            logger.info(f"Nuclei aggregated findings: {len(final_results)}")
-            return final_results
+            # Log the full command for debugging
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Executing Nuclei command: %s", shlex.join(shard_cmd))
+            if len(shards) > 1:
+                logger.info(f"Splitting Nuclei targets across {len(shards)} parallel processes")
+
+            # Latest (requests done, requests total, matched) reported by each shard
+            shard_progress: Dict[int, Tuple[int, int, int]] = {}
+            # Each shard reports from its own stderr drain thread; the lock covers the
+            # update, the sums over all shards and the callback
+            progress_lock = threading.Lock()
+
+            def report_progress(shard_index: int, stats: Dict[str, Any]):
+                try:
+                    progress = (int(stats["requests"]), int(stats["total"]), int(stats.get("matched", 0)))
+                except (KeyError, TypeError, ValueError):
+                    return
+                with progress_lock:
+                    shard_progress[shard_index] = progress
+                    if status_callback:
+                        done = sum(p[0] for p in shard_progress.values())
+                        total = sum(p[1] for p in shard_progress.values())
+                        matched = sum(p[2] for p in shard_progress.values())
+                        percent = min(100, done * 100 // total) if total else 0
+                        status_callback(f"Running Nuclei (Scanning {len(targets)} targets for vulnerabilities)... {percent}% done, {matched} matches so far")
+
+            # Findings are aggregated as they stream in, so only one entry per
+            # (template, location) is ever held; the lock serialises shard threads.
+            aggregated_results: Dict[Tuple[str, str], Dict[str, Any]] = {}
+            aggregate_lock = threading.Lock()
+
+            def add_finding(item: Dict[str, Any]):
+                with aggregate_lock:
+                    aggregate_finding(aggregated_results, item)
+
+            def run_shard(shard_index: int) -> int:
+                return self._run_nuclei_shard(shard_cmd, shards[shard_index], add_finding, lambda stats: report_progress(shard_index, stats))
+
+            with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+                raw_count = sum(pool.map(run_shard, range(len(shards))))
+
+            logger.info(f"Nuclei raw findings: {raw_count}")
+
+            logger.info(f"Nuclei aggregated findings: {len(aggregated_results)}")
+            for entry in aggregated_results.values():
+                del entry["_matchers_seen"]
+                del entry["_extracted_seen"]
+                yield entry
         except Exception as e:
             logger.exception(f"Exception while running Nuclei: {e}")
-            return []
 
     def run_discovery(self, domain: str, status_callback: Callable[[str], None] = None) -> Dict[str, Any]:
         """
-        Runs the discovery chain: Subfinder -> HTTPX
+        Runs the discovery chain: (Subfinder | Amass | theHarvester | Metagoofil) -> HTTPX
         """
+        # Junk input fails before any of the tools are spawned
+        if not is_valid_domain(domain):
+            raise ValueError(f"Invalid domain: {domain!r}")
 
 
-        # 1. Subfinder
+        # 1. Subfinder, Amass, theHarvester and Metagoofil
+        # The four enumerators are independent and spend their time waiting on the
+        # network, so they run side by side; the phase takes as long as the slowest one.
         if status_callback:
-            status_callback("Running Subfinder (Subdomain Enumeration)...")
-        subfinder_results = self.run_subfinder(domain)
-        
-        # 2. Amass
-        if status_callback:
-             status_callback("Running Amass (Active Enumeration & Brute Force)...")
-        amass_subdomains, amass_mx_records = self.run_amass(domain)
-
-        if status_callback:
-            status_callback("Running theHarvester (Email & Subdomain Enumeration)...")
-        emails, th_subdomains = self.run_theharvester(domain)
-
-        # 2.6 Metagoofil (Email Enumeration via Metadata)
-        if status_callback:
-             status_callback("Running Metagoofil (Document Metadata Analysis)...")
-        meta_emails = self.run_metagoofil(domain)
+            status_callback("Running Subfinder, Amass, theHarvester & Metagoofil (Subdomain & Email Enumeration)...")
+        # A fifth worker probes Subfinder's hosts with HTTPX as soon as it returns
+        # (seconds, against minutes for Amass), while the other three are still running.
+        with ThreadPoolExecutor(max_workers=5, thread_name_prefix="enum") as pool:
+            subfinder_future = pool.submit(self.run_subfinder, domain)
+            amass_future = pool.submit(self.run_amass, domain)
+            theharvester_future = pool.submit(self.run_theharvester, domain)
+            metagoofil_future = pool.submit(self.run_metagoofil, domain)
+
+            subfinder_results = subfinder_future.result()
+            early_targets = normalize_hosts(subfinder_results, [domain])
+            early_httpx_future = pool.submit(self.run_httpx, list(early_targets))
+
+            amass_subdomains, amass_mx_records = amass_future.result()
+            emails, th_subdomains = theharvester_future.result()
+            meta_emails = metagoofil_future.result()
+            early_live_hosts = early_httpx_future.result()
         
         # Merge Emails
-        total_emails = list(set(emails + meta_emails))
+        total_emails = set(emails)
+        total_emails.update(meta_emails)
+        total_emails = list(total_emails)
         logger.info(f"Total unique emails found: {len(total_emails)}")
 
         # Merge and deduplicate
-        # Convert both lists to a set to remove duplicates, then back to list
-        combined_subdomains = list(set(subfinder_results + amass_subdomains + th_subdomains))
-        
-        # Ensure root domain is always included in the probe list
-        if domain not in combined_subdomains:
-            combined_subdomains.append(domain)
+        # early_targets already holds Subfinder's hosts and the root domain, which is
+        # always included in the probe list. Only the names it lacks are probed below.
+        remaining_targets = normalize_hosts(amass_subdomains, th_subdomains) - early_targets
+        combined_subdomains = list(early_targets | remaining_targets)
+        remaining_targets = list(remaining_targets)
 
         logger.info(f"Total unique subdomains found: {len(combined_subdomains)}")
         
         # 3. HTTPX
+        httpx_message = f"Running HTTPX (Probing {len(combined_subdomains)} possible hosts)..."
         if status_callback:
-             status_callback(f"Running HTTPX (Probing {len(combined_subdomains)} possible hosts)...")
-        live_hosts_data = self.run_httpx(combined_subdomains)
+             status_callback(httpx_message)
+        # Hosts are consumed as httpx reports them, so the status can show progress.
+        # The two passes probe disjoint targets, so their results are simply concatenated.
+        live_hosts_data = early_live_hosts
+        for host in self.iter_httpx(remaining_targets):
+            live_hosts_data.append(host)
+            if status_callback and len(live_hosts_data) % HTTPX_PROGRESS_EVERY == 0:
+                status_callback(f"{httpx_message} {len(live_hosts_data)} live so far")
         
         return {
             "domain": domain,